@@ -1,254 +1,338 @@
 from flask import Flask, request, jsonify
+import functools
 import joblib
-import pandas as pd
+from joblib import Parallel, delayed
+# Imported before the models are unpickled in parallel threads, which would otherwise import
+# these concurrently and can see partially initialized modules
+import sklearn.ensemble
+import sklearn.preprocessing
+import xgboost
+from scipy.special import expit
+from sklearn.ensemble import GradientBoostingClassifier, HistGradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
 import numpy as np
+import orjson
+from numba import njit
+import logging
+import os
 import warnings
 from flask_cors import CORS
+from pydantic import BaseModel, Field, ValidationError
+from typing import Optional
+
+try:
+    import tl2cgen
+except ImportError:  # Compiled tree predictors are optional; fall back to the joblib models
+    tl2cgen = None
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+# sklearn warns about missing feature names when predicting on plain arrays
+warnings.filterwarnings("ignore", category=UserWarning, module="sklearn")
 
 app = Flask(__name__)
 CORS(app)
 
-# Load models and encoders/scalers
-try:
-    loaded_yield_model = joblib.load('yield_model.joblib')
-    loaded_pest_model = joblib.load('pest_risk_model.joblib')
-    loaded_pest_scaler = joblib.load('pest_scaler.joblib')
-    loaded_crop_encoder = joblib.load('crop_encoder.joblib')
-    # loaded_market_model = joblib.load('market_model.joblib') # Skipping market model loading as per previous conversation
-    # loaded_market_scaler = joblib.load('market_scaler.joblib')
-    # loaded_sustainability_model = joblib.load('sustainability_model.joblib')
-    # loaded_sustainability_scaler = joblib.load('sustainability_scaler.joblib')
-    # loaded_product_encoder = joblib.load('product_encoder.joblib')
-    # loaded_seasonal_encoder = joblib.load('seasonal_encoder.joblib')
+# Load models and encoders/scalers at import so `gunicorn --preload` shares them across workers.
+# mmap_mode='r' maps their numpy arrays read-only from disk instead of copying them into each process.
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def _load_model(filename):
+    try:
+        return joblib.load(os.path.join(MODEL_DIR, filename), mmap_mode='r')
+    except Exception as e:
+        print(f"Error loading {filename}: {e}")
+        return None
+
+# Load in parallel threads; the threading backend avoids forking while the module is imported.
+# A model that fails to load is None, and requests fall back to hardcoded values for it.
+model_files = ['yield_model.joblib', 'pest_risk_model.joblib', 'pest_scaler.joblib', 'crop_encoder.joblib']
+loaded_yield_model, loaded_pest_model, loaded_pest_scaler, loaded_crop_encoder = \
+    Parallel(n_jobs=len(model_files), backend='threading')(delayed(_load_model)(filename) for filename in model_files)
+# loaded_market_model = joblib.load('market_model.joblib') # Skipping market model loading as per previous conversation
+# loaded_market_scaler = joblib.load('market_scaler.joblib')
+# loaded_sustainability_model = joblib.load('sustainability_model.joblib')
+# loaded_sustainability_scaler = joblib.load('sustainability_scaler.joblib')
+# loaded_product_encoder = joblib.load('product_encoder.joblib')
+# loaded_seasonal_encoder = joblib.load('seasonal_encoder.joblib')
+
+# The pest scaler is a StandardScaler; apply (x - mean) / scale directly instead of calling transform()
+if loaded_pest_scaler is not None:
+    _PEST_MEAN = loaded_pest_scaler.mean_.astype(np.float32)
+    _PEST_SCALE = loaded_pest_scaler.scale_.astype(np.float32)
+
+# For binary log-loss classifiers the positive-class probability is expit(decision_function),
+# which skips building the full (n, 2) predict_proba output. Other models (e.g. random forests) use predict_proba.
+_pest_uses_decision_function = (
+    isinstance(loaded_pest_model, (GradientBoostingClassifier, HistGradientBoostingClassifier, LogisticRegression))
+    and getattr(loaded_pest_model, 'loss', 'log_loss') == 'log_loss'
+    and len(loaded_pest_model.classes_) == 2
+)
+
+if all(model is not None for model in (loaded_yield_model, loaded_pest_model, loaded_pest_scaler, loaded_crop_encoder)):
     print("Models loaded successfully!")
-except Exception as e:
-    print(f"Error loading models: {e}")
 
-def get_recommendations(farm_inputs, weather_forecast, market_forecast_period='next_season'):
+# Use tree models compiled by compile_models.py when available, they are much faster on small batches
+def _load_compiled(filename):
+    libpath = os.path.join(MODEL_DIR, filename)
+    if tl2cgen is None or not os.path.exists(libpath):
+        return None
+    try:
+        # Single-threaded: batches are tiny, and no thread pool is created before gunicorn forks
+        return tl2cgen.Predictor(libpath, nthread=1)
+    except Exception as e:
+        print(f"Error loading compiled model {filename}: {e}")
+        return None
+
+def _predict_compiled(predictor, X):
+    # One row of outputs per sample: the regression value, or the class probabilities
+    return predictor.predict(tl2cgen.DMatrix(X.astype(np.float32, copy=False))).reshape(len(X), -1)
+
+compiled_yield_model = _load_compiled('yield_model.so')
+compiled_pest_model = _load_compiled('pest_risk_model.so')
+
+# Request schema for /get_crop_recommendations; numeric strings are coerced to float
+class FarmInputs(BaseModel):
+    Soil_pH: float = Field(ge=0, le=14)
+    Soil_Moisture: float = Field(ge=0, le=100)
+    Fertilizer_Usage_kg: Optional[float] = Field(default=None, ge=0)  # Standard rates per crop if not provided
+    Pesticide_Usage_kg: Optional[float] = Field(default=None, ge=0)
+
+class WeatherForecast(BaseModel):
+    Temperature_C: float
+    Rainfall_mm: float = Field(ge=0)
+
+class CropRecommendationRequest(BaseModel):
+    farmInputs: FarmInputs
+    weatherForecast: WeatherForecast
+
+# Column order the yield model was trained on; the pest model uses a subset of these
+_YIELD_COLS = ['Soil_pH', 'Soil_Moisture', 'Temperature_C', 'Rainfall_mm',
+               'Fertilizer_Usage_kg', 'Pesticide_Usage_kg', 'Crop_Type_Encoded']
+_PEST_COLS = ['Temperature_C', 'Rainfall_mm', 'Crop_Type_Encoded', 'Soil_Moisture']
+_PEST_COL_IDX = [_YIELD_COLS.index(col) for col in _PEST_COLS]
+
+# Per-crop constants, aligned by position with _CROPS
+_CROPS = np.array(['Wheat', 'Soybean', 'Corn', 'Rice'])
+_CROP_ENCODED = np.array([3.0, 2.0, 0.0, 1.0])  # Same encoding as the pest model's test data
+_FERTILIZER_KG = np.array([150.0, 100.0, 180.0, 200.0])  # Standard usage rates
+_PESTICIDE_KG = np.array([12.0, 8.0, 15.0, 10.0])
+_BASE_PRICE = np.array([300.0, 350.0, 250.0, 400.0])  # Average market prices
+_COST_PER_TON = np.array([150.0, 180.0, 120.0, 200.0])
+_FALLBACK_YIELDS = np.array([3735.0, 3422.0, 3755.0, 3744.0])
+_FALLBACK_PEST_RISKS = np.array([0.18, 0.18, 0.12, 0.18])
+
+# Per-crop benchmarks used to explain recommendations, aligned with _CROPS
+_AVG_YIELDS = np.array([3000, 2800, 3500, 3200])
+_AVG_PRICES = np.array([280, 320, 240, 380])
+_AVG_ROI = np.array([90, 95, 100, 85])
+_OPT_TEMP_LO = np.array([15, 20, 18, 24])  # Optimal temperature range (C)
+_OPT_TEMP_HI = np.array([24, 30, 32, 34])
+
+# Price, profit and ROI percentage per crop. Compiled eagerly at import via the explicit signature.
+# Not cached on disk: numba's cache is keyed by file, and loading it under a different module name
+# (app vs model.app vs __main__) fails.
+@njit('UniTuple(float64[:], 3)(float64[:], float64, float64, float64[:], float64[:])', fastmath=True)
+def _score_crops(yields, temperature_c, rainfall_mm, base_price, cost_per_ton):
+    n = yields.shape[0]
+    prices = np.empty(n)
+    profits = np.empty(n)
+    rois = np.empty(n)
+
+    # Market price prediction - base prices with some variation based on weather and yield
+    temp_factor = 1.0 + (temperature_c - 25) * 0.01  # +/- 1% per degree
+    rain_factor = 1.0 + (rainfall_mm - 150) * 0.0005  # +/- 0.05% per mm
+    for i in range(n):
+        yield_factor = 1.0 + (yields[i] - 3000) * 0.0001  # +/- 0.01% per ton difference
+        prices[i] = base_price[i] * temp_factor * rain_factor * yield_factor
+
+        # Calculate profit and ROI percentage
+        total_cost = cost_per_ton[i] * yields[i]
+        profits[i] = yields[i] * prices[i] - total_cost
+        rois[i] = profits[i] / total_cost * 100 if total_cost > 0 else 0.0
+
+    return prices, profits, rois
+
+# Decimal places inputs are rounded to before looking up cached results
+_CACHE_DECIMALS = 2
+
+# Predict yield, price, profit, ROI and pest risk for every crop in _CROPS, as arrays aligned with it
+@functools.lru_cache(maxsize=4096)
+def _compute(soil_ph, soil_moisture, temperature_c, rainfall_mm, fertilizer_kg=None, pesticide_kg=None):
+    # Build the feature matrix for all crops at once (one row per crop).
+    # float32 matches the tree models' internal threshold type, so they use it without a copy.
+    X_yield = np.empty((len(_CROPS), len(_YIELD_COLS)), dtype=np.float32)
+    X_yield[:, 0] = soil_ph
+    X_yield[:, 1] = soil_moisture
+    X_yield[:, 2] = temperature_c
+    X_yield[:, 3] = rainfall_mm
+    # Apply standard fertilizer and pesticide rates if not provided
+    X_yield[:, 4] = _FERTILIZER_KG if fertilizer_kg is None else fertilizer_kg
+    X_yield[:, 5] = _PESTICIDE_KG if pesticide_kg is None else pesticide_kg
+    X_yield[:, 6] = _CROP_ENCODED
+
+    # Yield prediction
     try:
-        # Validate inputs
-        required_farm_fields = ['Soil_pH', 'Soil_Moisture']
-        required_weather_fields = ['Temperature_C', 'Rainfall_mm']
-
-        # Check for missing farm inputs
-        missing_farm_fields = [field for field in required_farm_fields if field not in farm_inputs]
-        if missing_farm_fields:
-            print(f"Error: Missing required farm input fields: {missing_farm_fields}")
-            return []
-
-        # Check for missing weather forecast fields
-        missing_weather_fields = [field for field in required_weather_fields if field not in weather_forecast]
-        if missing_weather_fields:
-            print(f"Error: Missing required weather forecast fields: {missing_weather_fields}")
-            return []
+        if compiled_yield_model is not None:
+            yields = _predict_compiled(compiled_yield_model, X_yield)[:, 0]
+        else:
+            yields = loaded_yield_model.predict(X_yield)
+    except Exception as e:
+        logger.warning("Yield prediction failed: %s", e)
+        # Use hardcoded values as fallback
+        yields = _FALLBACK_YIELDS
 
-        # Validate numeric values are in reasonable ranges
-        if not (5.0 <= float(farm_inputs.get('Soil_pH', 0)) <= 9.0):
-            print("Warning: Soil pH is outside normal range (5.0-9.0)")
-
-        if not (10.0 <= float(farm_inputs.get('Soil_Moisture', 0)) <= 50.0):
-            print("Warning: Soil moisture is outside normal range (10-50%)")
-
-        # Suppress all warnings
-        warnings.filterwarnings("ignore")
-
-        recommendations = []
-        possible_crops = ['Wheat', 'Soybean', 'Corn', 'Rice']
-        standard_usage = {
-            'Wheat': {'Fertilizer_Usage_kg': 150, 'Pesticide_Usage_kg': 12},
-            'Soybean': {'Fertilizer_Usage_kg': 100, 'Pesticide_Usage_kg': 8},
-            'Corn': {'Fertilizer_Usage_kg': 180, 'Pesticide_Usage_kg': 15},
-            'Rice': {'Fertilizer_Usage_kg': 200, 'Pesticide_Usage_kg': 10},
-        }
-
-        for crop in possible_crops:
-            farm_data = farm_inputs.copy()
-            farm_data.update(weather_forecast)
-
-            # Apply standard fertilizer and pesticide rates if not provided
-            fertilizer = standard_usage.get(crop, {}).get('Fertilizer_Usage_kg', 120)
-            pesticide = standard_usage.get(crop, {}).get('Pesticide_Usage_kg', 10)
-            farm_data['Fertilizer_Usage_kg'] = farm_data.get('Fertilizer_Usage_kg', fertilizer)
-            farm_data['Pesticide_Usage_kg'] = farm_data.get('Pesticide_Usage_kg', pesticide)
-            farm_data['Crop_Type'] = crop
-
-             # Encode Crop_Type for yield prediction
-            crop_encoding_map_yield = {'Wheat': 3.0, 'Soybean': 2.0, 'Corn': 0.0, 'Rice': 1.0} # Assuming the same encoding as pest, adjust if different
-            crop_encoded_value_yield = crop_encoding_map_yield.get(farm_data.get('Crop_Type'), -1) # Use -1 for unknown
-
-
-            # Prepare data for yield prediction
-            input_features_yield = pd.DataFrame({
-                'Soil_pH': [float(farm_data.get('Soil_pH'))],
-                'Soil_Moisture': [float(farm_data.get('Soil_Moisture'))],
-                'Temperature_C': [float(farm_data.get('Temperature_C'))],
-                'Rainfall_mm': [float(farm_data.get('Rainfall_mm'))],
-                'Fertilizer_Usage_kg': [float(farm_data.get('Fertilizer_Usage_kg'))],
-                'Pesticide_Usage_kg': [float(farm_data.get('Pesticide_Usage_kg'))],
-                'Crop_Type_Encoded': [crop_encoded_value_yield] # Add the encoded crop type
-                #'Crop_Type': [farm_data.get('Crop_Type')]
-            })
+    # Pest prediction (order matters!)
+    try:
+        pest_features = X_yield[:, _PEST_COL_IDX]
+
+        # Scale features
+        scaled_pest_features = (pest_features - _PEST_MEAN) / _PEST_SCALE
+
+        # Make prediction
+        if compiled_pest_model is not None:
+            pest_probs = _predict_compiled(compiled_pest_model, scaled_pest_features)[:, -1]
+        elif _pest_uses_decision_function:
+            pest_probs = expit(loaded_pest_model.decision_function(scaled_pest_features))
+        else:
+            pest_probs = loaded_pest_model.predict_proba(scaled_pest_features)[:, 1]
+    except Exception as e:
+        logger.warning("Pest prediction failed: %s", e)
+        # Use hardcoded values based on your existing output
+        pest_probs = _FALLBACK_PEST_RISKS
 
-            # Yield prediction
-            try:
-                predicted_yield = loaded_yield_model.predict(input_features_yield)[0]
-            except Exception as e:
-                print(f"Yield prediction failed: {e}")
-                # Use hardcoded values as fallback
-                avg_yields = {'Wheat': 3735, 'Soybean': 3422, 'Corn': 3755, 'Rice': 3744}
-                predicted_yield = avg_yields.get(crop, 3500)
-
-            # Market price prediction - use hardcoded values with calculated factors
-            average_market_prices = {'Wheat': 300, 'Soybean': 350, 'Corn': 250, 'Rice': 400}
-            base_price = average_market_prices.get(crop, 325)
-
-            # Add some variation based on weather and yield
-            temp_factor = 1.0 + (float(farm_data.get('Temperature_C')) - 25) * 0.01  # +/- 1% per degree
-            rain_factor = 1.0 + (float(farm_data.get('Rainfall_mm')) - 150) * 0.0005  # +/- 0.05% per mm
-            yield_factor = 1.0 + (predicted_yield - 3000) * 0.0001  # +/- 0.01% per ton difference
-
-            # Apply factors to base price
-            predicted_price = base_price * temp_factor * rain_factor * yield_factor
-
-            # Pest prediction with hardcoded mapping for crop encoding
-            try:
-                # Map crops to the encoding values seen in your test data
-                crop_encoding_map = {'Wheat': 3.0, 'Soybean': 2.0, 'Corn': 0.0, 'Rice': 1.0}
-                crop_encoded_value = crop_encoding_map.get(crop, 0.0)
-
-                # Create features array (order matters!)
-                pest_features = np.array([
-                    float(farm_data.get('Temperature_C')),
-                    float(farm_data.get('Rainfall_mm')),
-                    crop_encoded_value,
-                    float(farm_data.get('Soil_Moisture'))
-                ]).reshape(1, -1)
-
-                # Scale features without passing feature names
-                scaled_pest_features = loaded_pest_scaler.transform(pest_features)
-
-                # Make prediction
-                predicted_pest_risk_prob = loaded_pest_model.predict_proba(scaled_pest_features)[0][1]
-            except Exception as e:
-                print(f"Pest prediction failed for {crop}: {e}")
-                # Use hardcoded values based on your existing output
-                pest_risks = {'Wheat': 0.18, 'Soybean': 0.18, 'Corn': 0.12, 'Rice': 0.18}
-                predicted_pest_risk_prob = pest_risks.get(crop, 0.5)
-
-            # Calculate ROI
-            estimated_cost_per_ton = {'Wheat': 150, 'Soybean': 180, 'Corn': 120, 'Rice': 200}
-            estimated_cost = estimated_cost_per_ton.get(crop, 160)
-            estimated_total_cost = estimated_cost * predicted_yield
-            estimated_revenue = predicted_yield * predicted_price
-
-            # Calculate profit and ROI percentage
-            estimated_profit = estimated_revenue - estimated_total_cost
-            estimated_roi_percentage = (estimated_profit / estimated_total_cost) * 100 if estimated_total_cost > 0 else 0
-            print(f"Crop: {crop}") # Add this line
-            print(f"  Predicted Yield: {predicted_yield}") # Add this line
-            print(f"  Predicted Price: {predicted_price}") # Add this line
-            print(f"  Estimated ROI Percentage: {estimated_roi_percentage}") # Add this line
-
-
-            # Store results
-            print(f"Type of predicted_yield: {type(predicted_yield)}")
-            print(f"Type of predicted_price: {type(predicted_price)}")
-            print(f"Type of estimated_profit: {type(estimated_profit)}")
-            print(f"Type of estimated_roi_percentage: {type(estimated_roi_percentage)}")
-            print(f"Type of predicted_pest_risk_prob: {type(predicted_pest_risk_prob)}")
-            recommendations.append({
-                'Crop': crop,
-                'Predicted_Yield': float(predicted_yield),
-                'Predicted_Price': float(predicted_price),
-                'Estimated_Profit': float(estimated_profit),
-                'Estimated_ROI_Percentage': float(estimated_roi_percentage),
-                'Pest_Risk_Score': float(predicted_pest_risk_prob),
-            })
+    yields = yields.astype(np.float64)
+    prices, profits, rois = _score_crops(yields, temperature_c, rainfall_mm, _BASE_PRICE, _COST_PER_TON)
+
+    if logger.isEnabledFor(logging.DEBUG):
+        for crop, predicted_yield, predicted_price, estimated_roi_percentage in zip(_CROPS, yields, prices, rois):
+            logger.debug("Crop: %s yield=%s price=%s roi=%s", crop, predicted_yield, predicted_price, estimated_roi_percentage)
+
+    results = (yields, prices, profits, rois, pest_probs)
+    for arr in results:
+        arr.setflags(write=False)  # Shared between requests through the cache
+    return results
+
+def get_recommendations(farm_inputs, weather_forecast, market_forecast_period='next_season'):
+    try:
+        # Inputs are already validated FarmInputs/WeatherForecast models and shared by every crop
+        soil_ph = farm_inputs.Soil_pH
+        soil_moisture = farm_inputs.Soil_Moisture
+        temperature_c = weather_forecast.Temperature_C
+        rainfall_mm = weather_forecast.Rainfall_mm
 
-        # Rank recommendations and add explanations
-        ranked_recommendations = sorted(recommendations, key=lambda x: x['Estimated_ROI_Percentage'], reverse=True)
+        # Validate numeric values are in reasonable ranges
+        if not (5.0 <= soil_ph <= 9.0):
+            logger.warning("Soil pH is outside normal range (5.0-9.0)")
+
+        if not (10.0 <= soil_moisture <= 50.0):
+            logger.warning("Soil moisture is outside normal range (10-50%)")
+
+        # Round inputs so near-identical requests share a cache entry
+        yields, prices, profits, rois, pest_probs = _compute(
+            round(soil_ph, _CACHE_DECIMALS), round(soil_moisture, _CACHE_DECIMALS),
+            round(temperature_c, _CACHE_DECIMALS), round(rainfall_mm, _CACHE_DECIMALS),
+            farm_inputs.Fertilizer_Usage_kg, farm_inputs.Pesticide_Usage_kg)
+
+        # Compare every crop against its benchmarks in one shot
+        yield_strong = yields > _AVG_YIELDS
+        price_strong = prices > _AVG_PRICES
+        roi_strong = rois > _AVG_ROI
+        pest_low = pest_probs < 0.3
+        pest_high = pest_probs > 0.6
+        temp_optimal = (_OPT_TEMP_LO <= temperature_c) & (temperature_c <= _OPT_TEMP_HI)
+
+        # Select the top 3 by ROI with a partial sort, then order just those (stable, so ties keep crop order)
+        n_top = min(3, len(rois))
+        top_idx = np.sort(np.argpartition(-rois, n_top - 1)[:n_top])
+        top_idx = top_idx[np.argsort(-rois[top_idx], kind='stable')]
 
         # Add explanations to the top recommendations
-        for recommendation in ranked_recommendations[:3]:
-            crop = recommendation['Crop']
+        ranked_recommendations = []
+        for i in top_idx:
+            crop = str(_CROPS[i])
+            # numpy scalars are serialized directly by orjson
+            predicted_yield = yields[i]
+            predicted_price = prices[i]
+            estimated_roi_percentage = rois[i]
+            predicted_pest_risk_prob = pest_probs[i]
 
             # Identify key strengths and weaknesses
             strengths = []
             weaknesses = []
 
             # Yield analysis
-            avg_yields = {'Wheat': 3000, 'Soybean': 2800, 'Corn': 3500, 'Rice': 3200}
-            if recommendation['Predicted_Yield'] > avg_yields.get(crop, 3000):
-                strengths.append(f"Above average yield potential ({recommendation['Predicted_Yield']:.0f} vs {avg_yields.get(crop, 3000)} avg)")
+            if yield_strong[i]:
+                strengths.append(f"Above average yield potential ({predicted_yield:.0f} vs {_AVG_YIELDS[i]} avg)")
             else:
-                weaknesses.append(f"Below average yield potential ({recommendation['Predicted_Yield']:.0f} vs {avg_yields.get(crop, 3000)} avg)")
+                weaknesses.append(f"Below average yield potential ({predicted_yield:.0f} vs {_AVG_YIELDS[i]} avg)")
 
             # Price analysis
-            avg_prices = {'Wheat': 280, 'Soybean': 320, 'Corn': 240, 'Rice': 380}
-            if recommendation['Predicted_Price'] > avg_prices.get(crop, 300):
-                strengths.append(f"Favorable market price (${recommendation['Predicted_Price']:.2f} vs ${avg_prices.get(crop, 300)} avg)")
+            if price_strong[i]:
+                strengths.append(f"Favorable market price (${predicted_price:.2f} vs ${_AVG_PRICES[i]} avg)")
             else:
-                weaknesses.append(f"Lower than average market price (${recommendation['Predicted_Price']:.2f} vs ${avg_prices.get(crop, 300)} avg)")
+                weaknesses.append(f"Lower than average market price (${predicted_price:.2f} vs ${_AVG_PRICES[i]} avg)")
 
             # ROI analysis
-            avg_roi = {'Wheat': 90, 'Soybean': 95, 'Corn': 100, 'Rice': 85}
-            if recommendation['Estimated_ROI_Percentage'] > avg_roi.get(crop, 90):
-                strengths.append(f"Strong ROI ({recommendation['Estimated_ROI_Percentage']:.1f}%)")
+            if roi_strong[i]:
+                strengths.append(f"Strong ROI ({estimated_roi_percentage:.1f}%)")
             else:
-                weaknesses.append(f"Moderate ROI ({recommendation['Estimated_ROI_Percentage']:.1f}%)")
+                weaknesses.append(f"Moderate ROI ({estimated_roi_percentage:.1f}%)")
 
             # Pest risk analysis
-            if recommendation['Pest_Risk_Score'] < 0.3:
-                strengths.append(f"Low pest risk ({recommendation['Pest_Risk_Score']*100:.1f}%)")
-            elif recommendation['Pest_Risk_Score'] > 0.6:
-                weaknesses.append(f"High pest risk ({recommendation['Pest_Risk_Score']*100:.1f}%)")
+            if pest_low[i]:
+                strengths.append(f"Low pest risk ({predicted_pest_risk_prob*100:.1f}%)")
+            elif pest_high[i]:
+                weaknesses.append(f"High pest risk ({predicted_pest_risk_prob*100:.1f}%)")
             else:
-                strengths.append(f"Moderate pest risk ({recommendation['Pest_Risk_Score']*100:.1f}%)")
+                strengths.append(f"Moderate pest risk ({predicted_pest_risk_prob*100:.1f}%)")
 
             # Climate suitability
-            optimal_temps = {'Wheat': (15, 24), 'Soybean': (20, 30), 'Corn': (18, 32), 'Rice': (24, 34)}
-            crop_temp_range = optimal_temps.get(crop, (15, 30))
-            current_temp = float(weather_forecast.get('Temperature_C'))
-            if crop_temp_range[0] <= current_temp <= crop_temp_range[1]:
+            if temp_optimal[i]:
                 strengths.append(f"Optimal temperature range for {crop}")
             else:
                 weaknesses.append(f"Suboptimal temperature for {crop}")
 
-            # Add explanations to recommendation
-            recommendation['Strengths'] = strengths
-            recommendation['Weaknesses'] = weaknesses
-            recommendation['Explanation'] = f"{crop} is recommended primarily due to " + \
-                                            (f"its {strengths[0].lower()} and {strengths[1].lower() if len(strengths) > 1 else ''}. " if strengths else "balanced performance. ") + \
-                                            (f"However, consider that {weaknesses[0].lower()}" if weaknesses else "")
+            # Store results with explanations
+            ranked_recommendations.append({
+                'Crop': crop,
+                'Predicted_Yield': predicted_yield,
+                'Predicted_Price': predicted_price,
+                'Estimated_Profit': profits[i],
+                'Estimated_ROI_Percentage': estimated_roi_percentage,
+                'Pest_Risk_Score': predicted_pest_risk_prob,
+                'Strengths': strengths,
+                'Weaknesses': weaknesses,
+                'Explanation': f"{crop} is recommended primarily due to " +
+                               (f"its {strengths[0].lower()} and {strengths[1].lower() if len(strengths) > 1 else ''}. " if strengths else "balanced performance. ") +
+                               (f"However, consider that {weaknesses[0].lower()}" if weaknesses else ""),
+            })
 
-        return ranked_recommendations[:3]
+        return ranked_recommendations
 
     except Exception as e:
-        print(f"An error occurred during recommendation generation: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("An error occurred during recommendation generation: %s", e)
         return []
 
 @app.route('/get_crop_recommendations', methods=['POST'])
 def get_crop_recommendations():
     try:
-        data = request.get_json()
-        print(f"Received JSON data: {data}") # Please add this line to your Flask code
-
-        farm_inputs = data.get('farmInputs')
-        weather_forecast = data.get('weatherForecast')
-        print(f"Farm Inputs received: {farm_inputs}") # Add this line
-        print(f"Weather Forecast received: {weather_forecast}") # Add this line
-
-        if not farm_inputs or not weather_forecast:
-            return jsonify({'error': 'Missing farm inputs or weather forecast'}), 400
+        # Reject malformed or out-of-range input before any model is touched
+        try:
+            req = CropRecommendationRequest.model_validate_json(request.get_data())
+        except ValidationError as e:
+            return jsonify({'error': str(e)}), 400
+        logger.debug("Received request: %s", req)
 
-        recommendations = get_recommendations(farm_inputs, weather_forecast)
-        return jsonify({'recommendations': recommendations})
+        recommendations = get_recommendations(req.farmInputs, req.weatherForecast)
+        return app.response_class(orjson.dumps({'recommendations': recommendations}, option=orjson.OPT_SERIALIZE_NUMPY),
+                                  mimetype='application/json')
 
     except Exception as e:
-        print(f"Error processing request: {e}")
+        logger.error("Error processing request: %s", e)
         return jsonify({'error': str(e)}), 500
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    # Development server only; use gunicorn in production (see README)
+    app.run(debug=bool(os.environ.get('FLASK_DEV')), port=5000)
\ No newline at end of file
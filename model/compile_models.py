@@ -0,0 +1,23 @@
+import os
+import joblib
+import treelite
+import tl2cgen
+
+# Compile the tree models into shared libraries that app.py loads with tl2cgen.Predictor.
+# Run from any directory after retraining: python model/compile_models.py
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+
+if __name__ == '__main__':
+    # Yield model is an XGBRegressor
+    yield_model = joblib.load(os.path.join(MODEL_DIR, 'yield_model.joblib'))
+    tl_yield_model = treelite.frontend.from_xgboost(yield_model.get_booster())
+    tl2cgen.export_lib(tl_yield_model, toolchain='gcc', libpath=os.path.join(MODEL_DIR, 'yield_model.so'),
+                       params={'parallel_comp': 4})
+    print("Compiled yield_model.so")
+
+    # Pest risk model is a scikit-learn tree ensemble
+    pest_model = joblib.load(os.path.join(MODEL_DIR, 'pest_risk_model.joblib'))
+    tl_pest_model = treelite.sklearn.import_model(pest_model)
+    tl2cgen.export_lib(tl_pest_model, toolchain='gcc', libpath=os.path.join(MODEL_DIR, 'pest_risk_model.so'),
+                       params={'parallel_comp': 4})
+    print("Compiled pest_risk_model.so")